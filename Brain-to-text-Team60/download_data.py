@@ -2,17 +2,30 @@
 
 from __future__ import annotations
 
+import errno
 import os
 import sys
 import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
 from pathlib import Path
 
+_KAGGLE_IMPORT_ERROR: Exception | None = None
 try:
     from kaggle.api.kaggle_api_extended import KaggleApi
     KAGGLE_AVAILABLE = True
 except ImportError:
     KAGGLE_AVAILABLE = False
+except Exception as e:
+    # kaggle authenticates at import time and raises on missing or broken
+    # credentials (OSError, ValueError, ...). Keep this module importable so
+    # the data checks still work, and report the error from download_from_kaggle.
+    KaggleApi = None
+    KAGGLE_AVAILABLE = True
+    _KAGGLE_IMPORT_ERROR = e
 
 try:
     import requests
@@ -31,6 +44,202 @@ REQUIRED_FILES = [
     "data_test.hdf5"
 ]
 
+# Files are validated by their HDF5 signature only. Extracted files are
+# renamed into place once complete (see _extract_one), so a cut-off
+# extraction never shows up under the final name.
+HDF5_SIGNATURE = b"\x89HDF\r\n\x1a\n"
+
+# zipfile reads in small chunks by default; copy in 1 MiB blocks instead
+COPY_BUFFER_SIZE = 1 << 20
+
+
+def _preallocate(fd: int, size: int) -> None:
+    """Reserve ``size`` bytes for ``fd`` so the filesystem can lay it out contiguously."""
+    if size <= 0:
+        return
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError as e:
+            # Only fall back when the filesystem can't preallocate; errors
+            # such as ENOSPC must surface instead of leaving a sparse file.
+            if e.errno not in (errno.EOPNOTSUPP, errno.EINVAL):
+                raise
+    os.ftruncate(fd, size)
+
+
+def _extract_one(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, target: Path) -> None:
+    """Stream a single archive member to ``target``.
+
+    Chunks from ``read()`` are written straight to the file descriptor,
+    skipping the extra copy through Python's buffered writer. The member
+    is written to ``<target>.part`` and renamed into place only once
+    complete, so an interrupted extraction never leaves a preallocated,
+    half-written file under the final name.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    part = target.with_name(target.name + ".part")
+    try:
+        with zip_ref.open(info) as src:
+            fd = os.open(part, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+            try:
+                _preallocate(fd, info.file_size)
+                while chunk := src.read(COPY_BUFFER_SIZE):
+                    view = memoryview(chunk)
+                    while view:
+                        view = view[os.write(fd, view):]
+            finally:
+                os.close(fd)
+        os.replace(part, target)
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+
+
+def _extract_zip(zip_path: Path, dest_dir: Path) -> None:
+    """Extract every member of ``zip_path`` into ``dest_dir``."""
+    dest_root = dest_dir.resolve()
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for info in zip_ref.infolist():
+            target = (dest_dir / info.filename).resolve()
+            if dest_root not in target.parents:
+                print(f"  Skipping unsafe path in archive: {info.filename}")
+                continue
+            if info.is_dir():
+                target.mkdir(parents=True, exist_ok=True)
+                continue
+            _extract_one(zip_ref, info, target)
+
+
+def _hdf5_size(path: Path) -> int | None:
+    """Return the size of ``path`` if it starts with the HDF5 signature, else None.
+
+    The size comes from ``fstat`` on the descriptor already opened for the
+    signature check, so validating a file costs one open/read/fstat.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(HDF5_SIGNATURE)) != HDF5_SIGNATURE:
+                return None
+            return os.fstat(f.fileno()).st_size
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=1)
+def _scan_data_dir() -> dict[str, os.DirEntry]:
+    """Map file names in DATA_DIR to their directory entries.
+
+    One ``os.scandir`` pass answers existence checks without touching each
+    path. The result is cached; call ``_scan_data_dir.cache_clear()``
+    after writing to DATA_DIR.
+    """
+    with os.scandir(DATA_DIR) as it:
+        return {e.name: e for e in it if e.is_file()}
+
+
+def _valid_file_sizes() -> dict[str, int]:
+    """Sizes of the required files in DATA_DIR that pass ``_hdf5_size``.
+
+    Only files the cached directory scan lists are opened.
+    """
+    entries = _scan_data_dir()
+    sizes = {}
+    for f in REQUIRED_FILES:
+        if f not in entries:
+            continue
+        size = _hdf5_size(DATA_DIR / f)
+        if size is not None:
+            sizes[f] = size
+    return sizes
+
+
+def required_files_valid() -> bool:
+    """Return True if every required file is present and valid."""
+    return len(_valid_file_sizes()) == len(REQUIRED_FILES)
+
+
+def _download_kaggle_file(api: "KaggleApi", competition: str, fname: str) -> None:
+    """Download one competition file into DATA_DIR.
+
+    Kaggle serves large files compressed as ``<fname>.zip``; unpacking is
+    left to ``_unpack_kaggle_zip``.
+    """
+    try:
+        # We only get here after the local copy failed validation. Remove it
+        # so Kaggle can't keep it for being newer, but leave any partial
+        # <fname>.zip in place so Kaggle can resume it.
+        (DATA_DIR / fname).unlink(missing_ok=True)
+        api.competition_download_file(competition, fname, path=str(DATA_DIR))
+    finally:
+        _scan_data_dir.cache_clear()
+
+
+def _unpack_kaggle_zip(zip_file: Path) -> None:
+    """Extract a downloaded ``<fname>.zip`` into DATA_DIR and delete it."""
+    try:
+        print(f"Extracting {zip_file.name}...")
+        _extract_zip(zip_file, DATA_DIR)
+        zip_file.unlink()  # Remove zip right away to keep peak disk usage low
+    finally:
+        _scan_data_dir.cache_clear()
+
+
+def _retry_after(exc: Exception) -> float | None:
+    """Seconds to wait according to a Retry-After header on ``exc``, if any.
+
+    kaggle 1.6.x raises ``ApiException`` with ``.headers``; kaggle >= 1.7
+    raises ``requests.HTTPError`` with ``.response.headers``.
+    """
+    headers = getattr(exc, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+    value = headers.get("Retry-After") if headers else None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        # HTTP-date form, e.g. "Wed, 21 Oct 2015 07:28:00 GMT"
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _download_kaggle_file_with_retry(
+    api: "KaggleApi", competition: str, fname: str, max_retries: int
+) -> bool:
+    """Download one competition file, backing off on rate limits.
+
+    Waits as long as the server's Retry-After header asks, falling back to
+    exponential backoff. Returns False if still rate limited after
+    ``max_retries`` attempts; any other error is raised.
+    """
+    print(f"Downloading {fname}...")
+    for attempt in range(max_retries):
+        try:
+            _download_kaggle_file(api, competition, fname)
+            return True
+                
+        except Exception as e:
+            if "429" in str(e) or "Too Many Requests" in str(e):
+                if attempt < max_retries - 1:
+                    wait_time = _retry_after(e)
+                    if wait_time is None:
+                        wait_time = min(2 ** (attempt + 1), 60)  # Exponential backoff, max 60s
+                    print(f"Rate limited on {fname}. Waiting {wait_time:.0f} seconds before retry {attempt + 2}/{max_retries}...")
+                    time.sleep(wait_time)
+                    continue
+                print(f"Rate limited after {max_retries} attempts.")
+                print("Please wait a few minutes and try again, or download manually.")
+                return False
+            raise
+    return False
+
 
 def download_from_kaggle() -> bool:
     """Download data using Kaggle API."""
@@ -48,6 +257,10 @@ def download_from_kaggle() -> bool:
         print(f"  {kaggle_dir}")
         return False
     
+    if _KAGGLE_IMPORT_ERROR is not None:
+        print(f"Kaggle API failed to initialise: {_KAGGLE_IMPORT_ERROR}")
+        return False
+    
     try:
         api = KaggleApi()
         api.authenticate()
@@ -57,51 +270,40 @@ def download_from_kaggle() -> bool:
         competition = "brain-to-text-25"
         print(f"Downloading data from competition: {competition}")
         
-        # Retry logic with exponential backoff
+        # Only fetch files that are missing or fail validation
+        valid = _valid_file_sizes()
+        to_download = [f for f in REQUIRED_FILES if f not in valid]
+        skipped = [f for f in REQUIRED_FILES if f not in to_download]
+        if skipped:
+            print(f"Skipping valid files: {', '.join(skipped)}")
+        
         max_retries = 5
-        for attempt in range(max_retries):
-            try:
-                if attempt > 0:
-                    wait_time = min(2 ** attempt, 60)  # Exponential backoff, max 60s
-                    print(f"Waiting {wait_time} seconds before retry {attempt + 1}/{max_retries}...")
-                    time.sleep(wait_time)
-                
-                api.competition_download_files(competition, path=str(DATA_DIR))
-                
-                # Extract zip files if any
-                for zip_file in DATA_DIR.glob("*.zip"):
-                    print(f"Extracting {zip_file.name}...")
-                    with zipfile.ZipFile(zip_file, 'r') as zip_ref:
-                        zip_ref.extractall(DATA_DIR)
-                    zip_file.unlink()  # Remove zip after extraction
-                
-                # Check if files exist
-                all_found = all((DATA_DIR / f).exists() for f in REQUIRED_FILES)
-                if all_found:
-                    print("✓ All data files downloaded successfully!")
-                    return True
-                else:
-                    # List what we got
-                    print("\nFiles in data directory:")
-                    for f in sorted(DATA_DIR.glob("*")):
-                        if f.is_file():
-                            size_mb = f.stat().st_size / (1024 * 1024)
-                            print(f"  {f.name}: {size_mb:.2f} MB")
-                    print("\nSome required files are missing after download")
+        
+        # Download one file at a time, so a retry only re-fetches the failing
+        # one and rate limits aren't hit by parallel requests. Each zip is
+        # extracted on a worker thread while the next file downloads.
+        with ThreadPoolExecutor(max_workers=1) as extractor:
+            extractions = []
+            for fname in to_download:
+                if not _download_kaggle_file_with_retry(api, competition, fname, max_retries):
                     return False
-                    
-            except Exception as e:
-                if "429" in str(e) or "Too Many Requests" in str(e):
-                    if attempt < max_retries - 1:
-                        print(f"Rate limited. Retrying...")
-                        continue
-                    else:
-                        print(f"Rate limited after {max_retries} attempts.")
-                        print("Please wait a few minutes and try again, or download manually.")
-                        return False
-                else:
-                    raise
+                zip_file = DATA_DIR / f"{fname}.zip"
+                if zip_file.exists():
+                    extractions.append(extractor.submit(_unpack_kaggle_zip, zip_file))
+            for future in extractions:
+                future.result()
+        
+        # Check every file is present and valid
+        if required_files_valid():
+            print("✓ All data files downloaded successfully!")
+            return True
         
+        # List what we got
+        print("\nFiles in data directory:")
+        for name, entry in sorted(_scan_data_dir().items()):
+            size_mb = entry.stat().st_size / (1024 * 1024)
+            print(f"  {name}: {size_mb:.2f} MB")
+        print("\nSome required files are missing after download")
         return False
             
     except Exception as e:
@@ -126,19 +328,18 @@ def download_from_dryad() -> bool:
 
 def check_existing_files() -> bool:
     """Check if data files already exist."""
-    existing = [f for f in REQUIRED_FILES if (DATA_DIR / f).exists()]
-    if len(existing) == len(REQUIRED_FILES):
+    sizes = _valid_file_sizes()
+    existing = [f for f in REQUIRED_FILES if f in sizes]
+    missing = [f for f in REQUIRED_FILES if f not in sizes]
+    if not missing:
         print("✓ All data files already exist!")
-        for f in REQUIRED_FILES:
-            size_mb = (DATA_DIR / f).stat().st_size / (1024 * 1024)
-            print(f"  {f}: {size_mb:.2f} MB")
+        for f in existing:
+            print(f"  {f}: {sizes[f] / (1024 * 1024):.2f} MB")
         return True
     elif existing:
         print(f"Found {len(existing)}/{len(REQUIRED_FILES)} files:")
         for f in existing:
-            size_mb = (DATA_DIR / f).stat().st_size / (1024 * 1024)
-            print(f"  ✓ {f}: {size_mb:.2f} MB")
-        missing = [f for f in REQUIRED_FILES if f not in existing]
+            print(f"  ✓ {f}: {sizes[f] / (1024 * 1024):.2f} MB")
         print(f"Missing: {', '.join(missing)}")
     return False
 
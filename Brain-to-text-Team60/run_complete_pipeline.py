@@ -8,10 +8,16 @@ This script will:
 5. Create submission CSV
 
 Run with: python run_complete_pipeline.py
+
+Each step is imported and run in this interpreter. Pass ``--subprocess`` to
+run the step scripts in separate Python processes instead.
 """
 
 from __future__ import annotations
 
+import argparse
+import importlib
+import os
 import subprocess
 import sys
 import time
@@ -21,49 +27,95 @@ BASE_DIR = Path(__file__).parent
 DATA_DIR = BASE_DIR / "data"
 PROCESSED_DIR = DATA_DIR / "processed"
 
-# Try to download first
-print("="*70)
-print("BRAIN-TO-TEXT COMPLETE PIPELINE")
-print("="*70)
-
-# Step 0: Download data
-print("\n[STEP 0] Checking for data files...")
-download_script = BASE_DIR / "download_data.py"
-if download_script.exists():
-    result = subprocess.run([sys.executable, str(download_script)], cwd=BASE_DIR)
-    if result.returncode != 0:
-        print("\n⚠ Data download failed or files not found.")
-        print("Please ensure data files are in:", DATA_DIR)
-        print("Required: data_train.hdf5, data_val.hdf5, data_test.hdf5")
-        
-        # Check if files exist anyway
-        all_exist = all((DATA_DIR / f"data_{split}.hdf5").exists() 
-                       for split in ["train", "val", "test"])
-        if not all_exist:
-            print("\n❌ Cannot proceed without data files.")
-            print("\nTo download manually:")
-            print("1. Go to: https://www.kaggle.com/competitions/brain-to-text-25/data")
-            print("2. Accept competition rules")
-            print("3. Download the HDF5 files")
-            print(f"4. Place them in: {DATA_DIR}")
-            sys.exit(1)
-        else:
-            print("✓ Found data files, proceeding...")
-else:
-    # Check if files exist
-    all_exist = all((DATA_DIR / f"data_{split}.hdf5").exists() 
-                   for split in ["train", "val", "test"])
-    if not all_exist:
-        print("❌ Data files not found. Please download them first.")
-        sys.exit(1)
-
-# Step 1: Run full pipeline
-print("\n[STEP 1] Running preprocessing, training, and inference...")
-pipeline_script = BASE_DIR / "run_full_pipeline.py"
-if pipeline_script.exists():
-    result = subprocess.run([sys.executable, str(pipeline_script)], cwd=BASE_DIR)
-    sys.exit(result.returncode)
-else:
-    print("❌ Pipeline script not found!")
-    sys.exit(1)
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the complete brain-to-text pipeline.")
+    parser.add_argument(
+        "--subprocess",
+        action="store_true",
+        help="Run each step script in a separate Python process.",
+    )
+    return parser.parse_args()
+
+
+def _run_script(script: Path, use_subprocess: bool) -> int:
+    """Run ``script``'s ``main()`` and return its exit code."""
+    if use_subprocess:
+        return subprocess.run([sys.executable, str(script)], cwd=BASE_DIR).returncode
+
+    # Fail like a crashed child process would: report and return non-zero.
+    try:
+        module = importlib.import_module(script.stem)
+        code = module.main()
+    except SystemExit as e:
+        code = e.code
+    except Exception as e:
+        print(f"❌ {script.name} failed: {e}")
+        return 1
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    # sys.exit("message"): print it to stderr like the interpreter would
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _data_files_present() -> bool:
+    """Return True if all required data files are present and valid."""
+    try:
+        import download_data
+    except Exception as e:
+        print(f"Could not check data files: {e}")
+        return False
+    return download_data.required_files_valid()
+
+
+def main() -> int:
+    args = parse_args()
+    os.chdir(BASE_DIR)
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+
+    print("="*70)
+    print("BRAIN-TO-TEXT COMPLETE PIPELINE")
+    print("="*70)
+
+    # Step 0: Download data
+    print("\n[STEP 0] Checking for data files...")
+    download_script = BASE_DIR / "download_data.py"
+    if download_script.exists():
+        if _run_script(download_script, args.subprocess) != 0:
+            print("\n⚠ Data download failed or files not found.")
+            print("Please ensure data files are in:", DATA_DIR)
+            print("Required: data_train.hdf5, data_val.hdf5, data_test.hdf5")
+
+            # Check if valid files are there anyway
+            if not _data_files_present():
+                print("\n❌ Cannot proceed without data files.")
+                print("\nTo download manually:")
+                print("1. Go to: https://www.kaggle.com/competitions/brain-to-text-25/data")
+                print("2. Accept competition rules")
+                print("3. Download the HDF5 files")
+                print(f"4. Place them in: {DATA_DIR}")
+                return 1
+            else:
+                print("✓ Found data files, proceeding...")
+    else:
+        # Check if valid files are there
+        if not _data_files_present():
+            print("❌ Data files not found. Please download them first.")
+            return 1
+
+    # Step 1: Run full pipeline
+    print("\n[STEP 1] Running preprocessing, training, and inference...")
+    pipeline_script = BASE_DIR / "run_full_pipeline.py"
+    if pipeline_script.exists():
+        return _run_script(pipeline_script, args.subprocess)
+    else:
+        print("❌ Pipeline script not found!")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())